@@ -6,6 +6,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.background import BackgroundGenerator
 from src.text import TextRenderer
 from src.synthesizer import Synthesizer
+from src.charset import get_common_chars
+from src._jsonio import dump_json
 
 def parse_args():
     parser = argparse.ArgumentParser(description='中文标注数据合成工具')
@@ -27,6 +29,14 @@ def parse_args():
                         help='输出目录')
     parser.add_argument('--char-count', type=int, default=50,
                         help='生成的汉字数量')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='并行合成的进程数，默认使用全部CPU核心')
+    parser.add_argument('--pin-cpu', action='store_true',
+                        help='将每个工作进程绑定到单个CPU核心（仅Linux）')
+    parser.add_argument('--png-level', type=int, choices=range(10), default=1,
+                        help='PNG压缩级别（0-9），越低编码越快')
+    parser.add_argument('--io-threads', type=int, default=4,
+                        help='单进程执行时用于保存图片的线程数，0表示同步保存')
     
     # 导出模式参数
     parser.add_argument('--export-format', type=str, choices=['coco', 'yolo', 'createml'],
@@ -41,6 +51,10 @@ def parse_args():
                         help='验证集比例')
     parser.add_argument('--test-ratio', type=float, default=0.1,
                         help='测试集比例')
+    parser.add_argument('--link', action='store_true',
+                        help='使用硬链接代替复制图片（需位于同一文件系统）')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='划分数据集的随机种子')
     
     return parser.parse_args()
 
@@ -51,7 +65,7 @@ def generate_data(args):
     # 初始化组件
     bg_generator = BackgroundGenerator()
     text_renderer = TextRenderer()
-    synthesizer = Synthesizer(bg_generator, text_renderer)
+    synthesizer = Synthesizer(bg_generator, text_renderer, args.png_level)
     
     # 加载背景图片目录
     background_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'background')
@@ -71,28 +85,16 @@ def generate_data(args):
     # 设置文字颜色
     text_renderer.set_text_color(tuple(args.text_color))
     
-    # 生成汉字列表
-    common_chars = []
-    for i in range(0xB0, 0xD8):
-        for j in range(0xA1, 0xFE):
-            try:
-                gb_bytes = bytes([i, j])
-                char = gb_bytes.decode('gb2312')
-                common_chars.append(char)
-            except:
-                continue
-    
-    # 取指定数量的汉字
-    common_chars = common_chars[:args.char_count]
-    texts = [char for char in common_chars]
+    # 取指定数量的常用汉字
+    texts = list(get_common_chars()[:args.char_count])
     
     # 批量生成数据
-    annotations = synthesizer.batch_synthesize(texts, args.output_dir)
+    annotations = synthesizer.batch_synthesize(texts, args.output_dir,
+                                               workers=args.workers, pin_cpu=args.pin_cpu,
+                                               io_threads=args.io_threads)
     
     # 保存标注数据
-    import json
-    with open(os.path.join(args.output_dir, 'annotations.json'), 'w', encoding='utf-8') as f:
-        json.dump(annotations, f, ensure_ascii=False, indent=2)
+    dump_json(annotations, os.path.join(args.output_dir, 'annotations.json'))
     
     print(f'已生成 {len(texts)} 个样本')
     print(f'图像保存在: {args.output_dir}')
@@ -102,7 +104,7 @@ def export_dataset(args):
     from src.export import DatasetExporter
     
     # 初始化数据集导出器
-    exporter = DatasetExporter(args.output_dir)
+    exporter = DatasetExporter(args.output_dir, link=args.link, seed=args.seed)
     
     # 确保导出目录存在
     os.makedirs(args.export_dir, exist_ok=True)
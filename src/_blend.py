@@ -0,0 +1,50 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba为可选依赖，未安装时由调用方使用PIL的paste合成
+    njit = None
+
+
+if njit is not None:
+    # 文字图块只有约200x200像素，多线程的调度开销大于收益，且多进程合成时
+    # 每个进程各自启动线程池会造成CPU超额订阅，因此使用单线程内核
+    @njit(cache=True)
+    def alpha_over(dst, src, x, y):
+        """将RGBA文字图块按透明度叠加到背景上（Numba内核）
+
+        只遍历图块与背景重叠的区域。RGB背景的结果与PIL带蒙版的paste一致，
+        RGBA背景的结果与Image.alpha_composite一致。
+
+        Args:
+            dst (numpy.ndarray): 背景数组，HxWx3或HxWx4，原地修改
+            src (numpy.ndarray): 文字图块，hxwx4
+            x (int): 图块左上角x坐标
+            y (int): 图块左上角y坐标
+        """
+        h = min(src.shape[0], dst.shape[0] - y)
+        w = min(src.shape[1], dst.shape[1] - x)
+        channels = dst.shape[2]
+        for i in range(h):
+            for j in range(w):
+                a = np.int32(src[i, j, 3])
+                if a == 0:
+                    continue
+                inv = 255 - a
+                if channels == 3:
+                    for c in range(3):
+                        dst[y + i, x + j, c] = (np.int32(src[i, j, c]) * a
+                                                + np.int32(dst[y + i, x + j, c]) * inv + 127) // 255
+                else:
+                    # 与PIL的Image.alpha_composite使用相同的整数运算，保证结果逐位一致
+                    out_a = a * 255 + np.int32(dst[y + i, x + j, 3]) * inv
+                    coef1 = a * 255 * 255 * 128 // out_a
+                    coef2 = 255 * 128 - coef1
+                    for c in range(3):
+                        tmp = (np.int32(src[i, j, c]) * coef1
+                               + np.int32(dst[y + i, x + j, c]) * coef2 + (0x80 << 7))
+                        dst[y + i, x + j, c] = (((tmp >> 8) + tmp) >> 8) >> 7
+                    out_a += 0x80
+                    dst[y + i, x + j, 3] = ((out_a >> 8) + out_a) >> 8
+else:
+    alpha_over = None
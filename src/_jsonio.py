@@ -0,0 +1,39 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+
+def dump_json(data, path):
+    """将数据以UTF-8编码、两空格缩进写入JSON文件
+
+    安装了orjson时使用其C实现序列化，否则使用标准库json。
+
+    Args:
+        data: 要保存的数据
+        path (str): 输出文件路径
+    """
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load_json(path):
+    """读取UTF-8编码的JSON文件
+
+    Args:
+        path (str): 文件路径
+
+    Returns:
+        解析后的数据
+    """
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -3,6 +3,7 @@ import numpy as np
 from PIL import Image
 import os
 import random
+from collections import OrderedDict
 
 class BackgroundGenerator:
     """背景图像生成器类
@@ -10,8 +11,20 @@ class BackgroundGenerator:
     负责生成或处理用于合成的背景图像
     """
     
-    def __init__(self):
+    def __init__(self, background_cache_size=None):
+        """初始化背景生成器
+        
+        Args:
+            background_cache_size (int, optional): 背景目录中已解码图片的缓存数量，
+                默认为None，即每张图片只解码一次并一直保留
+        """
         self.image = None
+        self._image_array = None
+        self.background_cache_size = background_cache_size
+        # 已解码的背景图片，按最近使用顺序排列：路径 -> (PIL图像, 像素数组)
+        self._background_cache = OrderedDict()
+        # 噪声背景使用的随机数生成器（PCG64）
+        self._rng = np.random.default_rng()
         
     def load_image(self, image_path):
         """加载背景图像
@@ -24,6 +37,7 @@ class BackgroundGenerator:
         """
         try:
             self.image = Image.open(image_path)
+            self._image_array = None
             return True
         except Exception as e:
             print(f"加载图像失败: {e}")
@@ -39,13 +53,17 @@ class BackgroundGenerator:
             bool: 加载是否成功
         """
         try:
-            self.background_images = []
+            # 只记录文件路径，图片在首次被选中时才解码
+            self.background_paths = []
+            self._background_cache.clear()
             for filename in os.listdir(directory_path):
                 if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
                     image_path = os.path.join(directory_path, filename)
-                    image = Image.open(image_path)
-                    self.background_images.append(image)
-            return len(self.background_images) > 0
+                    # 只读取文件头校验图片格式，不解码像素
+                    with Image.open(image_path):
+                        pass
+                    self.background_paths.append(image_path)
+            return len(self.background_paths) > 0
         except Exception as e:
             print(f"加载背景图片目录失败: {e}")
             return False
@@ -56,10 +74,68 @@ class BackgroundGenerator:
         Returns:
             PIL.Image: 随机选择的背景图像
         """
-        if hasattr(self, 'background_images') and self.background_images:
-            return random.choice(self.background_images)
+        if getattr(self, 'background_paths', None):
+            return self._load_background(random.choice(self.background_paths))[0]
         return self.image
         
+    def get_background_array(self):
+        """随机获取一个背景图像的像素数组
+        
+        Returns:
+            numpy.ndarray: HxWx3(RGB)或HxWx4(RGBA)的uint8数组，未设置背景时返回None
+        """
+        if getattr(self, 'background_paths', None):
+            return self._load_background(random.choice(self.background_paths))[1]
+        if self.image is None:
+            return None
+        if self._image_array is None:
+            self._image_array = self._to_array(self.image)
+        return self._image_array
+        
+    def _load_background(self, image_path):
+        """解码背景图片，已解码的图片会被缓存以避免重复解码
+        
+        Args:
+            image_path (str): 背景图片路径
+            
+        Returns:
+            tuple: (PIL图像, 只读的像素数组)
+        """
+        cached = self._background_cache.get(image_path)
+        if cached is not None:
+            self._background_cache.move_to_end(image_path)
+            return cached
+            
+        image = Image.open(image_path)
+        image.load()
+        cached = (image, self._to_array(image))
+        self._background_cache[image_path] = cached
+        if self.background_cache_size is not None:
+            while len(self._background_cache) > max(self.background_cache_size, 1):
+                self._background_cache.popitem(last=False)
+        return cached
+        
+    def __getstate__(self):
+        # 传递到工作进程时不携带已解码的图片，由各进程按需解码
+        state = self.__dict__.copy()
+        state['_background_cache'] = OrderedDict()
+        return state
+        
+    @staticmethod
+    def _to_array(image):
+        """将PIL图像转换为只读的连续uint8数组，保留透明通道
+        
+        Args:
+            image (PIL.Image): 背景图像
+            
+        Returns:
+            numpy.ndarray: 像素数组
+        """
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        array = np.ascontiguousarray(image.convert('RGBA' if has_alpha else 'RGB'))
+        array.flags.writeable = False
+        return array
+        
     def generate_solid_background(self, width, height, color=(255, 255, 255)):
         """生成纯色背景
         
@@ -69,6 +145,7 @@ class BackgroundGenerator:
             color (tuple): RGB颜色值，默认为白色
         """
         self.image = Image.new('RGB', (width, height), color)
+        self._image_array = None
         
     def generate_random_noise(self, width, height):
         """生成随机噪声背景
@@ -77,8 +154,9 @@ class BackgroundGenerator:
             width (int): 背景宽度
             height (int): 背景高度
         """
-        noise = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+        noise = self._rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
         self.image = Image.fromarray(noise)
+        self._image_array = None
         
     def get_background(self):
         """获取当前背景图像
@@ -96,4 +174,5 @@ class BackgroundGenerator:
             height (int): 目标高度
         """
         if self.image:
-            self.image = self.image.resize((width, height), Image.LANCZOS)
\ No newline at end of file
+            self.image = self.image.resize((width, height), Image.LANCZOS)
+            self._image_array = None
@@ -0,0 +1,20 @@
+import functools
+
+
+@functools.lru_cache(maxsize=1)
+def get_common_chars():
+    """获取GB2312一级常用汉字（按拼音排序）
+
+    结果在进程内只计算一次。
+
+    Returns:
+        tuple: 常用汉字元组
+    """
+    chars = []
+    for i in range(0xB0, 0xD8):
+        for j in range(0xA1, 0xFE):
+            try:
+                chars.append(bytes((i, j)).decode('gb2312'))
+            except UnicodeDecodeError:
+                continue
+    return tuple(chars)
@@ -1,30 +1,37 @@
 import os
-import json
-import shutil
 import random
+import shutil
+import numpy as np
 from PIL import Image
 
+from ._jsonio import dump_json, load_json
+
 class DatasetExporter:
     """数据集导出类
     
     支持将合成的数据集导出为不同的格式，并支持训练集/验证集/测试集划分
     """
     
-    def __init__(self, input_dir):
+    def __init__(self, input_dir, link=False, seed=None):
         """初始化导出器
         
         Args:
             input_dir (str): 输入目录，包含图片和annotations.json
+            link (bool): 是否以硬链接代替复制图片（需与输入目录位于同一文件系统，
+                失败时自动回退为复制）
+            seed (int, optional): 划分数据集时使用的随机种子，默认为None，
+                即由random模块生成，可通过random.seed()复现划分结果
         """
         self.input_dir = input_dir
+        self.link = link
+        self.seed = seed
         self.annotations_path = os.path.join(input_dir, 'annotations.json')
         
         # 加载标注数据
         if not os.path.exists(self.annotations_path):
             raise FileNotFoundError(f'找不到标注文件：{self.annotations_path}')
             
-        with open(self.annotations_path, 'r', encoding='utf-8') as f:
-            self.annotations = json.load(f)
+        self.annotations = load_json(self.annotations_path)
             
     def split_dataset(self, output_dir, train_ratio=0.7, val_ratio=0.2, test_ratio=0.1):
         """划分数据集
@@ -46,19 +53,19 @@ class DatasetExporter:
         if not (0.99 < total_ratio < 1.01):  # 允许小数点误差
             raise ValueError('数据集划分比例之和必须为1')
             
-        # 随机打乱数据
-        indices = list(range(len(self.annotations)))
-        random.shuffle(indices)
+        # 随机打乱数据（NumPy生成随机排列，避免Python层逐元素交换）
+        seed = self.seed if self.seed is not None else random.getrandbits(64)
+        total_size = len(self.annotations)
+        indices = np.random.default_rng(seed).permutation(total_size)
         
         # 计算每个集合的大小
-        total_size = len(indices)
         train_size = int(total_size * train_ratio)
         val_size = int(total_size * val_ratio)
         
         # 划分数据集
-        train_indices = indices[:train_size]
-        val_indices = indices[train_size:train_size + val_size]
-        test_indices = indices[train_size + val_size:]
+        train_indices = indices[:train_size].tolist()
+        val_indices = indices[train_size:train_size + val_size].tolist()
+        test_indices = indices[train_size + val_size:].tolist()
         
         return train_indices, val_indices, test_indices
     
@@ -110,7 +117,7 @@ class DatasetExporter:
             
             # 复制图片
             image_name = os.path.basename(ann['image_path'])
-            shutil.copy2(ann['image_path'], os.path.join(output_dir, image_name))
+            self._copy_image(ann['image_path'], os.path.join(output_dir, image_name))
             
             # 转换标注格式
             createml_ann = {
@@ -128,8 +135,7 @@ class DatasetExporter:
             createml_annotations.append(createml_ann)
         
         # 保存标注文件
-        with open(os.path.join(output_dir, 'annotations.json'), 'w', encoding='utf-8') as f:
-            json.dump(createml_annotations, f, ensure_ascii=False, indent=2)
+        dump_json(createml_annotations, os.path.join(output_dir, 'annotations.json'))
     
     def export_yolo(self, output_dir, split=True, train_ratio=0.7, val_ratio=0.2, test_ratio=0.1):
         """导出为YOLO格式
@@ -189,36 +195,75 @@ class DatasetExporter:
             labels_dir (str): 标签目录
             subset (str, optional): 子集名称（train/val/test）
         """
-        for idx in indices:
-            ann = self.annotations[idx]
-            
-            # 获取图片信息
+        anns = [self.annotations[idx] for idx in indices]
+        if not anns:
+            return
+        
+        # 确定目标目录
+        if subset:
+            dst_img_dir = os.path.join(images_dir, subset)
+            dst_label_dir = os.path.join(labels_dir, subset)
+        else:
+            dst_img_dir = images_dir
+            dst_label_dir = labels_dir
+        
+        # 批量转换标注格式（YOLO格式：<class> <x_center> <y_center> <width> <height>）
+        position = np.array([ann['position'] for ann in anns], dtype=np.float64)
+        size = np.array([ann['size'] for ann in anns], dtype=np.float64)
+        image_size = np.array([self._get_image_size(ann) for ann in anns], dtype=np.float64)
+        boxes = np.hstack(((position + size / 2) / image_size, size / image_size))
+        
+        for ann, box in zip(anns, boxes.tolist()):
+            # 复制图片
             image_path = ann['image_path']
             image_name = os.path.basename(image_path)
-            image = Image.open(image_path)
-            img_width, img_height = image.size
-            
-            # 确定目标目录
-            if subset:
-                dst_img_dir = os.path.join(images_dir, subset)
-                dst_label_dir = os.path.join(labels_dir, subset)
-            else:
-                dst_img_dir = images_dir
-                dst_label_dir = labels_dir
-            
-            # 复制图片
-            shutil.copy2(image_path, os.path.join(dst_img_dir, image_name))
-            
-            # 转换标注格式（YOLO格式：<class> <x_center> <y_center> <width> <height>）
-            x_center = (ann['position'][0] + ann['size'][0] / 2) / img_width
-            y_center = (ann['position'][1] + ann['size'][1] / 2) / img_height
-            width = ann['size'][0] / img_width
-            height = ann['size'][1] / img_height
+            self._copy_image(image_path, os.path.join(dst_img_dir, image_name))
             
             # 保存标签文件
             label_name = os.path.splitext(image_name)[0] + '.txt'
             with open(os.path.join(dst_label_dir, label_name), 'w') as f:
-                f.write(f'0 {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}\n')
+                f.write('0 %.6f %.6f %.6f %.6f\n' % tuple(box))
+    
+    def _copy_image(self, src, dst):
+        """将图片复制到导出目录
+        
+        启用硬链接时直接创建目录项而不复制数据；否则使用shutil.copyfile，
+        在Linux上由内核sendfile完成复制
+        
+        Args:
+            src (str): 源图片路径
+            dst (str): 目标图片路径
+        """
+        if self.link:
+            try:
+                if os.path.lexists(dst):
+                    # 目标已经是源文件本身（或其硬链接）时无需处理，且不能先删除目标；
+                    # 失效的符号链接不指向任何文件，直接删除
+                    if os.path.exists(dst) and os.path.samefile(src, dst):
+                        return
+                    os.remove(dst)
+                os.link(src, dst)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(src, dst)
+    
+    @staticmethod
+    def _get_image_size(ann):
+        """获取标注对应图片的尺寸
+        
+        优先使用合成时记录在标注中的尺寸，旧版本生成的标注则只读取图片文件头
+        
+        Args:
+            ann (dict): 标注数据
+            
+        Returns:
+            tuple: (宽, 高)
+        """
+        if 'image_size' in ann:
+            return tuple(ann['image_size'])
+        with Image.open(ann['image_path']) as image:
+            return image.size
     
     def export_coco(self, output_dir, split=True, train_ratio=0.7, val_ratio=0.2, test_ratio=0.1):
         """导出为COCO格式
@@ -256,58 +301,37 @@ class DatasetExporter:
             indices (list): 数据索引列表
             output_dir (str): 输出目录
         """
-        # 创建COCO格式的数据结构
-        coco_data = {
-            'info': {
-                'description': 'Synthesized Chinese Text Dataset',
-                'version': '1.0',
-                'year': 2024,
-                'contributor': 'Synthesizer',
-                'date_created': '2024'
-            },
-            'licenses': [{
-                'id': 1,
-                'name': 'Unknown',
-                'url': 'Unknown'
-            }],
-            'images': [],
-            'annotations': [],
-            'categories': [{
-                'id': 1,
-                'name': 'text',
-                'supercategory': 'text'
-            }]
-        }
+        # 每张图片对应一条标注，预先分配列表后按位置填充
+        images = [None] * len(indices)
+        annotations = [None] * len(indices)
         
-        ann_id = 1  # COCO格式要求annotation_id从1开始
-        
-        for img_id, idx in enumerate(indices, 1):  # COCO格式要求image_id从1开始
+        for i, idx in enumerate(indices):
             ann = self.annotations[idx]
+            img_id = i + 1  # COCO格式要求image_id和annotation_id从1开始
             
             # 复制图片
             image_name = os.path.basename(ann['image_path'])
-            shutil.copy2(ann['image_path'], os.path.join(output_dir, image_name))
+            self._copy_image(ann['image_path'], os.path.join(output_dir, image_name))
             
             # 获取图片信息
-            image = Image.open(ann['image_path'])
-            width, height = image.size
+            width, height = self._get_image_size(ann)
             
             # 添加图片信息
-            coco_data['images'].append({
+            images[i] = {
                 'id': img_id,
                 'width': width,
                 'height': height,
                 'file_name': image_name,
                 'license': 1,
                 'date_captured': '2024'
-            })
+            }
             
             # 添加标注信息
             x, y = ann['position']
             w, h = ann['size']
             
-            coco_data['annotations'].append({
-                'id': ann_id,
+            annotations[i] = {
+                'id': img_id,
                 'image_id': img_id,
                 'category_id': 1,
                 'bbox': [x, y, w, h],
@@ -318,4 +342,30 @@ class DatasetExporter:
                     'text': ann['text'],
                     'transform': ann['transform']
                 }
-            })
\ No newline at end of file
+            }
+        
+        # 创建COCO格式的数据结构
+        coco_data = {
+            'info': {
+                'description': 'Synthesized Chinese Text Dataset',
+                'version': '1.0',
+                'year': 2024,
+                'contributor': 'Synthesizer',
+                'date_created': '2024'
+            },
+            'licenses': [{
+                'id': 1,
+                'name': 'Unknown',
+                'url': 'Unknown'
+            }],
+            'images': images,
+            'annotations': annotations,
+            'categories': [{
+                'id': 1,
+                'name': 'text',
+                'supercategory': 'text'
+            }]
+        }
+        
+        # 保存标注文件
+        dump_json(coco_data, os.path.join(output_dir, 'annotations.json'))
\ No newline at end of file
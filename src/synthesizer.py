@@ -1,22 +1,41 @@
+import os
+import queue
 import random
 import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from PIL import Image
 
+from ._blend import alpha_over
+
 class Synthesizer:
     """合成器类
     
     负责将背景和文字组合，生成标注数据
     """
     
-    def __init__(self, background_generator, text_renderer):
+    def __init__(self, background_generator, text_renderer, png_compress_level=1):
         """初始化合成器
         
         Args:
             background_generator: 背景生成器实例
             text_renderer: 文字渲染器实例
+            png_compress_level (int): 保存PNG时的zlib压缩级别（0-9），
+                级别越低编码越快、文件越大
         """
         self.background_generator = background_generator
         self.text_renderer = text_renderer
+        self.png_compress_level = png_compress_level
+        # 按背景尺寸缓存的可复用合成缓冲区
+        self._scratch = {}
+        
+    def __getstate__(self):
+        # 合成缓冲区只在当前进程内复用，传递到工作进程时不携带，由工作进程按需重新分配
+        state = self.__dict__.copy()
+        state['_scratch'] = {}
+        return state
         
     def generate_random_position(self, text_width, text_height, background_width, background_height):
         """生成随机位置
@@ -64,69 +83,254 @@ class Synthesizer:
         Returns:
             tuple: (合成后的图像, 标注数据)
         """
-        # 获取背景图像
-        background = self.background_generator.get_background()
-        if not background:
+        return self._synthesize(text, transform, reuse_buffer=False)
+        
+    def _synthesize(self, text, transform, reuse_buffer):
+        """合成图像
+        
+        Args:
+            text (str): 要合成的文字
+            transform (dict): 变换参数
+            reuse_buffer (bool): 是否在复用的合成缓冲区中合成。为True时返回的图像
+                可能与缓冲区共享内存，仅在下一次合成之前有效
+                
+        Returns:
+            tuple: (合成后的图像, 标注数据)
+        """
+        # 获取背景图像（预解码的像素数组）
+        background = self.background_generator.get_background_array()
+        if background is None:
             raise ValueError("背景图像未设置")
             
         # 渲染文字
-        text_image = self.text_renderer.render_text(text)
+        text_array = np.asarray(self.text_renderer.render_text(text))
         
-        # 应用变换
+        # 应用变换：旋转直接在像素数组上进行，不再生成中间PIL图像
         if transform:
             if 'rotation' in transform:
-                text_image = self.text_renderer.apply_rotation(text_image, transform['rotation'])
+                text_array = self.text_renderer.rotate_array(text_array, transform['rotation'])
             if 'perspective' in transform:
-                text_image = self.text_renderer.apply_perspective(text_image, transform['perspective'])
+                text_image = self.text_renderer.apply_perspective(
+                    Image.fromarray(text_array), transform['perspective'])
+                text_array = np.asarray(text_image)
+        text_height, text_width = text_array.shape[:2]
         
         # 生成随机位置
         position = self.generate_random_position(
-            text_image.width,
-            text_image.height,
-            background.width,
-            background.height,
+            text_width,
+            text_height,
+            background.shape[1],
+            background.shape[0],
         )
         
-        # 合成图像
-        result = background.copy()
-        result.paste(text_image, position, text_image)
+        if alpha_over is not None:
+            # 合成图像：将背景拷贝到合成缓冲区，只在文字覆盖的区域内做alpha混合
+            if reuse_buffer:
+                canvas = self._get_scratch(background)
+                np.copyto(canvas, background)
+            else:
+                canvas = background.copy()
+            alpha_over(canvas, text_array, position[0], position[1])
+            result = Image.fromarray(canvas)
+        else:
+            # 未安装Numba时使用PIL合成，PIL会先复制只读的背景数据。RGBA背景使用
+            # alpha_composite，使透明度通道与Numba内核的结果一致
+            text_image = Image.fromarray(text_array)
+            result = Image.fromarray(background)
+            if result.mode == 'RGBA':
+                result.alpha_composite(text_image, position)
+            else:
+                result.paste(text_image, position, text_image)
         
         # 生成标注数据
         annotation = {
             'text': text,
             'position': (position[0] + 10, position[1] + 10),
-            'size': (text_image.width - 20, text_image.height - 20),
-            'transform': transform if transform else {}
+            'size': (text_width - 20, text_height - 20),
+            'transform': transform if transform else {},
+            'image_size': (background.shape[1], background.shape[0])
         }
         
         return result, annotation
         
-    def batch_synthesize(self, texts, output_dir, start_index=0):
+    def _get_scratch(self, background):
+        """获取与背景数组尺寸一致的合成缓冲区
+        
+        Args:
+            background (numpy.ndarray): 背景像素数组
+            
+        Returns:
+            numpy.ndarray: 可写的缓冲区
+        """
+        scratch = self._scratch.get(background.shape)
+        if scratch is None:
+            scratch = np.empty_like(background)
+            self._scratch[background.shape] = scratch
+        return scratch
+        
+    def synthesize_to_file(self, index, text, output_dir):
+        """合成单个样本并保存到输出目录
+        
+        Args:
+            index (int): 样本索引，用于生成文件名
+            text (str): 要合成的文字
+            output_dir (str): 输出目录
+            
+        Returns:
+            dict: 标注数据
+        """
+        image, annotation = self._synthesize_sample(index, text, output_dir)
+        self._save_image(image, annotation['image_path'])
+        return annotation
+        
+    def _synthesize_sample(self, index, text, output_dir, reuse_buffer=True):
+        """合成单个样本，不保存图像
+        
+        Args:
+            index (int): 样本索引，用于生成文件名
+            text (str): 要合成的文字
+            output_dir (str): 输出目录
+            reuse_buffer (bool): 是否在复用的合成缓冲区中合成
+            
+        Returns:
+            tuple: (合成后的图像, 含图像路径的标注数据)。复用缓冲区时图像可能与缓冲区
+                共享内存，需在下一次合成之前保存
+        """
+        # 生成随机变换
+        transform = self.generate_random_transform()
+        
+        # 合成图像
+        image, annotation = self._synthesize(text, transform, reuse_buffer)
+        
+        # 添加图像路径到标注数据
+        annotation['image_path'] = f"{output_dir}/{index:06d}.png"
+        return image, annotation
+        
+    def _save_image(self, image, image_path):
+        """以PNG格式保存图像
+        
+        Args:
+            image (PIL.Image): 图像
+            image_path (str): 保存路径
+        """
+        image.save(image_path, format='PNG', compress_level=self.png_compress_level)
+        
+    def batch_synthesize(self, texts, output_dir, start_index=0, workers=1, pin_cpu=False,
+                         io_threads=4):
         """批量合成图像
         
         Args:
             texts (list): 要合成的文字列表
             output_dir (str): 输出目录
             start_index (int): 起始索引
+            workers (int): 并行进程数，1表示在当前进程中顺序执行，None表示使用全部CPU核心
+            pin_cpu (bool): 是否将每个工作进程绑定到单个CPU核心（仅Linux有效）
+            io_threads (int): 在当前进程中执行时用于PNG编码和写盘的线程数，
+                0表示同步保存
             
         Returns:
             list: 标注数据列表
         """
-        annotations = []
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(texts))
         
-        for i, text in enumerate(texts, start_index):
-            # 生成随机变换
-            transform = self.generate_random_transform()
-            
-            # 合成图像
-            image, annotation = self.synthesize(text, transform)
-            
-            # 保存图像
-            image_path = f"{output_dir}/{i:06d}.png"
-            image.save(image_path)
-            
-            # 添加图像路径到标注数据
-            annotation['image_path'] = image_path
-            annotations.append(annotation)
+        if workers <= 1:
+            if io_threads <= 0:
+                return [self.synthesize_to_file(i, text, output_dir)
+                        for i, text in enumerate(texts, start_index)]
+            return self._batch_synthesize_async(texts, output_dir, start_index, io_threads)
+        
+        # 样本之间相互独立，分发到多个进程并行合成和编码
+        cpu_queue = None
+        if pin_cpu and hasattr(os, 'sched_setaffinity'):
+            cpu_queue = multiprocessing.Queue()
+            for cpu in sorted(os.sched_getaffinity(0)):
+                cpu_queue.put(cpu)
+                
+        tasks = [(i, text, output_dir) for i, text in enumerate(texts, start_index)]
+        chunksize = max(1, len(tasks) // (workers * 4))
+        annotations = [None] * len(tasks)
+        
+        try:
+            with multiprocessing.Pool(workers, _init_worker, (self, cpu_queue)) as pool:
+                for i, annotation in pool.imap_unordered(_synthesize_task, tasks, chunksize):
+                    annotations[i - start_index] = annotation
+        finally:
+            if cpu_queue is not None:
+                cpu_queue.close()
+                cpu_queue.join_thread()
+                
+        return annotations
+        
+    def _batch_synthesize_async(self, texts, output_dir, start_index, io_threads):
+        """在当前进程中批量合成，PNG编码和写盘交给线程池
+        
+        zlib压缩时会释放GIL，因此下一个样本的合成可以与上一个样本的保存同时进行
+        
+        Args:
+            texts (list): 要合成的文字列表
+            output_dir (str): 输出目录
+            start_index (int): 起始索引
+            io_threads (int): 保存图像的线程数
             
-        return annotations
\ No newline at end of file
+        Returns:
+            list: 标注数据列表
+        """
+        annotations = []
+        pending = deque()
+        
+        with ThreadPoolExecutor(io_threads) as io_pool:
+            for i, text in enumerate(texts, start_index):
+                # 图像交给线程保存时下一个样本已开始合成，因此不使用复用的缓冲区，
+                # 每个样本只在合成时拷贝一次背景
+                image, annotation = self._synthesize_sample(i, text, output_dir, reuse_buffer=False)
+                pending.append(io_pool.submit(self._save_image, image, annotation['image_path']))
+                annotations.append(annotation)
+                
+                # 限制待保存的图像数量，避免编码跟不上时内存无限增长
+                if len(pending) > io_threads * 2:
+                    pending.popleft().result()
+                    
+            for future in pending:
+                future.result()
+                
+        return annotations
+
+
+# 工作进程中的合成器实例，由_init_worker设置
+_worker_synthesizer = None
+
+
+def _init_worker(synthesizer, cpu_queue):
+    """初始化工作进程
+    
+    Args:
+        synthesizer (Synthesizer): 合成器实例
+        cpu_queue (multiprocessing.Queue): 可绑定的CPU核心编号队列，为None时不绑定
+    """
+    global _worker_synthesizer
+    _worker_synthesizer = synthesizer
+    
+    # fork出的子进程继承了相同的随机数状态，需要重新播种
+    random.seed()
+    np.random.seed()
+    
+    if cpu_queue is not None:
+        try:
+            os.sched_setaffinity(0, {cpu_queue.get_nowait()})
+        except queue.Empty:
+            pass
+
+
+def _synthesize_task(task):
+    """工作进程中合成单个样本
+    
+    Args:
+        task (tuple): (样本索引, 文字, 输出目录)
+        
+    Returns:
+        tuple: (样本索引, 标注数据)
+    """
+    index, text, output_dir = task
+    return index, _worker_synthesizer.synthesize_to_file(index, text, output_dir)
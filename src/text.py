@@ -1,3 +1,4 @@
+import math
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
@@ -8,9 +9,20 @@ class TextRenderer:
     负责汉字的渲染和变换处理
     """
     
-    def __init__(self):
+    def __init__(self, perspective_interpolation=cv2.INTER_LINEAR):
+        """初始化文字渲染器
+        
+        Args:
+            perspective_interpolation (int): 透视变换使用的OpenCV插值方式，
+                文字已抗锯齿，默认双线性插值即可，需要更高质量时可用cv2.INTER_CUBIC
+        """
         self.font = None
         self.text_color = (0, 0, 0)  # 默认黑色文字
+        self.perspective_interpolation = perspective_interpolation
+        # 按(字体路径, 字号)缓存已解析的字体，避免重复读取TTF文件
+        self._font_cache = {}
+        # 按(字体路径, 字号, 文字, 目标尺寸)缓存缩放后的字体和绘制位置
+        self._layout_cache = {}
         
     def load_font(self, font_path, font_size):
         """加载字体
@@ -23,7 +35,7 @@ class TextRenderer:
             bool: 加载是否成功
         """
         try:
-            self.font = ImageFont.truetype(font_path, font_size)
+            self.font = self._get_font(font_path, font_size)
             return True
         except Exception as e:
             print(f"加载字体失败: {e}")
@@ -50,10 +62,27 @@ class TextRenderer:
         if not self.font:
             raise ValueError("请先加载字体")
             
-        # 创建目标大小的透明背景图像
-        image = Image.new('RGBA', target_size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(image)
+        font, position = self._prepare(text, tuple(target_size))
+        return self._draw(text, target_size, font, position)
+        
+    def _prepare(self, text, target_size):
+        """计算文字适应目标尺寸的字体和绘制位置
         
+        结果按(字体路径, 基础字号, 文字, 目标尺寸)缓存，相同文字再次渲染时
+        无需重新测量边界框和加载字体
+        
+        Args:
+            text (str): 要渲染的文字
+            target_size (tuple): 目标图像大小
+            
+        Returns:
+            tuple: (缩放后的字体, 绘制位置)
+        """
+        key = (self.font.path, self.font.size, text, target_size)
+        layout = self._layout_cache.get(key)
+        if layout is not None:
+            return layout
+            
         # 计算目标尺寸，可以通过修改这个比例来调整文字大小
         target_width = int(target_size[0] * 0.9)  # 增加到90%
         target_height = int(target_size[1] * 0.9)  # 增加到90%
@@ -73,26 +102,50 @@ class TextRenderer:
             scale = min(target_width / current_width, target_height / current_height)
             new_font_size = int(font_size * scale)
         
-        # 使用新的字体大小
-        self.font = ImageFont.truetype(self.font.path, new_font_size)
-        
-        # 获取新字体大小下的文字边界框和字体度量信息
-        bbox = self.font.getbbox(text)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        metrics = self.font.getmetrics()
-        ascent = metrics[0]
-        descent = metrics[1]
-        
         # 计算居中位置
         # 使用mm作为anchor实现完全居中
-        x = target_size[0] // 2
-        y = target_size[1] // 2
+        position = (target_size[0] // 2, target_size[1] // 2)
+        
+        layout = (self._get_font(self.font.path, new_font_size), position)
+        self._layout_cache[key] = layout
+        return layout
+        
+    def _draw(self, text, target_size, font, position):
+        """在透明背景上绘制文字
+        
+        Args:
+            text (str): 要渲染的文字
+            target_size (tuple): 目标图像大小
+            font (ImageFont.FreeTypeFont): 字体
+            position (tuple): 绘制位置（文字中心）
+            
+        Returns:
+            PIL.Image: 渲染后的文字图像
+        """
+        # 创建目标大小的透明背景图像
+        image = Image.new('RGBA', target_size, (0, 0, 0, 0))
         
         # 绘制文字，使用mm作为anchor实现水平和垂直居中
-        draw.text((x, y), text, font=self.font, fill=self.text_color, anchor="mm")
+        ImageDraw.Draw(image).text(position, text, font=font, fill=self.text_color, anchor="mm")
         return image
         
+    def _get_font(self, font_path, font_size):
+        """获取指定路径和字号的字体，已加载过的字体直接复用
+        
+        Args:
+            font_path (str): 字体文件路径
+            font_size (int): 字体大小
+            
+        Returns:
+            ImageFont.FreeTypeFont: 字体对象
+        """
+        key = (font_path, font_size)
+        font = self._font_cache.get(key)
+        if font is None:
+            font = ImageFont.truetype(font_path, font_size)
+            self._font_cache[key] = font
+        return font
+        
     def apply_rotation(self, image, angle):
         """对文字图像进行旋转
         
@@ -105,6 +158,50 @@ class TextRenderer:
         """
         return image.rotate(angle, expand=True, resample=Image.BICUBIC)
         
+    def rotate_array(self, array, angle):
+        """对文字像素数组进行旋转
+        
+        使用单次OpenCV仿射变换完成旋转（90度的整数倍直接转置），输出尺寸与apply_rotation一致
+        
+        Args:
+            array (numpy.ndarray): HxWx4的RGBA文字数组
+            angle (float): 旋转角度（逆时针为正）
+            
+        Returns:
+            numpy.ndarray: 旋转后的RGBA数组
+        """
+        # 与PIL一致，90度的整数倍直接转置像素，不做插值也不扩展画布
+        quarter_turns, remainder = divmod(angle % 360, 90)
+        if remainder == 0:
+            return np.ascontiguousarray(np.rot90(array, int(quarter_turns)))
+            
+        height, width = array.shape[:2]
+        
+        # 按PIL.Image.rotate(expand=True)的方式计算扩展后的画布尺寸
+        radians = math.radians(angle)
+        cos = round(math.cos(radians), 15)
+        sin = round(math.sin(radians), 15)
+        cx, cy = width / 2, height / 2
+        corners = ((0, 0), (width, 0), (width, height), (0, height))
+        xs = [cos * (x - cx) - sin * (y - cy) + cx for x, y in corners]
+        ys = [sin * (x - cx) + cos * (y - cy) + cy for x, y in corners]
+        new_width = math.ceil(max(xs)) - math.floor(min(xs))
+        new_height = math.ceil(max(ys)) - math.floor(min(ys))
+        
+        # 绕图像中心旋转，再平移到扩展后画布的中心
+        matrix = cv2.getRotationMatrix2D(((width - 1) / 2, (height - 1) / 2), angle, 1.0)
+        matrix[0, 2] += (new_width - width) / 2
+        matrix[1, 2] += (new_height - height) / 2
+        
+        return cv2.warpAffine(
+            array,
+            matrix,
+            (new_width, new_height),
+            flags=cv2.INTER_CUBIC,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0, 0)
+        )
+        
     def apply_perspective(self, image, points):
         """应用透视变换
         
@@ -128,30 +225,27 @@ class TextRenderer:
         
         # 目标图像的四个角点，限制变换范围
         dst_points = np.float32(points)
-        # 计算每个点的偏移量，并限制在合理范围内
-        max_offset = min(width, height) * 0.05  # 限制最大偏移为图像尺寸的5%
-        for i in range(4):
-            dx = dst_points[i][0] - src_points[i][0]
-            dy = dst_points[i][1] - src_points[i][1]
-            # 使用双曲正切函数限制偏移量
-            dx = max_offset * np.tanh(dx / max_offset)
-            dy = max_offset * np.tanh(dy / max_offset)
-            dst_points[i] = [src_points[i][0] + dx, src_points[i][1] + dy]
+        # 计算每个点的偏移量，并使用双曲正切函数限制在合理范围内
+        max_offset = np.float32(min(width, height) * 0.05)  # 限制最大偏移为图像尺寸的5%
+        offset = dst_points - src_points
+        dst_points = src_points + max_offset * np.tanh(offset / max_offset)
         
         # 计算透视变换矩阵
         matrix = cv2.getPerspectiveTransform(src_points, dst_points)
         
-        # 转换为OpenCV格式进行处理
-        img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGBA2BGRA)
+        # 透视变换对各通道独立插值，直接使用RGBA像素视图，无需转换为BGRA
+        src = np.asarray(image)
         
-        # 应用透视变换，使用更好的插值方法
+        # 应用透视变换
+        # BORDER_TRANSPARENT不会写入映射到源图像外的像素，因此输出需预先清零
         result = cv2.warpPerspective(
-            img_cv,
+            src,
             matrix,
             (width, height),
-            flags=cv2.INTER_CUBIC,  # 使用三次插值
+            dst=np.zeros_like(src),
+            flags=self.perspective_interpolation,
             borderMode=cv2.BORDER_TRANSPARENT
         )
         
-        # 转换回PIL格式
-        return Image.fromarray(cv2.cvtColor(result, cv2.COLOR_BGRA2RGBA))
+        # 转换回PIL格式（共享数组内存）
+        return Image.fromarray(result)